@@ -0,0 +1,100 @@
+import os
+import random
+import threading
+import pathlib
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+
+# --- CONFIGURATION ---
+CURRENT_DIR = pathlib.Path(__file__).parent.resolve()
+# CURRENT_DIR = pathlib.Path.cwd()
+SHOWS_DIR = CURRENT_DIR / "shows"
+# Kept small so a Pi doesn't thrash USB storage with parallel walks
+SCAN_WORKERS = 4
+EXT_SET = frozenset({"mp4", "mkv", "avi", "webm"})
+
+# --- GLOBAL STATE ---
+# Episode index built by scan_shows(), rebuilt when SHOWS_DIR changes
+all_shows = {}
+_all_eps_flat = []
+_shows_mtime = None
+# Shuffled play queues per show ("__all__" for shuffle-all), refilled when empty
+_queues = {}
+# One Random per thread so callers on different threads don't share generator state
+_rng = threading.local()
+
+# --- FUNCTIONS ---
+def _random():
+    r = getattr(_rng, "r", None)
+    if r is None:
+        r = _rng.r = random.Random()
+    return r
+
+def scan_shows():
+    global all_shows, _all_eps_flat, _shows_mtime, _queues
+    print("\n--- SHOWS LOADED ---")
+    shows = {}
+    total_episodes = 0
+    mtime = os.stat(SHOWS_DIR).st_mtime_ns
+
+    with os.scandir(SHOWS_DIR) as it:
+        entries = sorted((e for e in it if e.is_dir()), key=lambda e: e.name)
+    with ThreadPoolExecutor(max_workers=max(1, min(SCAN_WORKERS, len(entries)))) as ex:
+        for entry, episodes in zip(entries, ex.map(lambda e: list(iter_episodes(e.path)), entries)):
+            if episodes:
+                shows[entry.name] = episodes
+                total_episodes += len(episodes)
+
+    all_shows = shows
+    _all_eps_flat = list(itertools.chain.from_iterable(shows.values()))
+    _shows_mtime = mtime
+    _queues = {}
+
+    for show, episodes in shows.items():
+        percent = (len(episodes) / total_episodes * 100) if total_episodes else 0
+        print(f"{show}: {len(episodes)} episodes ({percent:.1f}%)")
+
+    print(f"Total episodes: {total_episodes}")
+    print("--- END SHOW SCAN ---\n")
+
+def ensure_index():
+    if os.stat(SHOWS_DIR).st_mtime_ns != _shows_mtime:
+        scan_shows()
+
+def next_for(show):
+    """Pop the next episode for show, reshuffling once every episode has played."""
+    q = _queues.get(show)
+    if not q:
+        eps = list(_all_eps_flat if show == "__all__" else all_shows.get(show, ()))
+        if not eps:
+            return None
+        _random().shuffle(eps)
+        q = deque(eps)
+        _queues[show] = q
+    return q.pop()
+
+def _is_video(name):
+    # Lowercase only the extension, not the whole filename
+    _, dot, ext = name.rpartition(".")
+    return bool(dot) and ext.lower() in EXT_SET
+
+def get_random_file(path):
+    with os.scandir(path) as it:
+        files = [e.path for e in it if e.is_file() and _is_video(e.name)]
+    return _random().choice(files) if files else None
+
+def iter_episodes(show_path):
+    stack = [show_path]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
+            # Skip unreadable directories (e.g. lost+found), as os.walk did
+            continue
+        with it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif _is_video(entry.name):
+                    yield entry.path
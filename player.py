@@ -0,0 +1,204 @@
+import os
+import subprocess
+import tempfile
+import threading
+import urllib.parse
+
+# --- CONFIGURATION ---
+# Long-lived cvlc driven over its rc interface, so switching videos doesn't
+# pay for process startup. The OSD text is read from a file (--marq-file) so it
+# can change per video on the one marq filter; RcPlayer appends that option.
+RC_CMD = (
+    "cvlc", "--fullscreen", "--quiet", "--video-on-top", "--gain=3",
+    "--no-video-title-show", "--intf", "rc", "--rc-fake-tty", "--aout", "alsa",
+    "--no-sub-autodetect-file", "--no-spu", "--input-fast-seek", "--play-and-stop",
+    "--sub-source=marq",
+    "--marq-timeout=0",
+    "--marq-refresh=100",
+    "--marq-position=0",
+    "--marq-size=0",
+    "--marq-opacity=255",
+    "--marq-color=0xFFFFFF",
+)
+RC_STARTUP_SECONDS = 5
+# A VLC that exits this soon after printing its banner counts as a failed start
+RC_SETTLE_SECONDS = 0.5
+OSD_SECONDS = 2
+
+# --- FUNCTIONS ---
+def _rc_quote(arg):
+    return '"' + arg.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+def _mrl_path(line):
+    """Return the local path from a 'status change: ( new input: <mrl> )' line."""
+    mrl = line.split("new input:", 1)[1].strip().rstrip(")").strip()
+    if mrl.startswith("file://"):
+        # Same escaping os.fsdecode() uses, so non-UTF-8 names still match
+        return urllib.parse.unquote(urllib.parse.urlparse(mrl).path, errors="surrogateescape")
+    return mrl
+
+class RcPlayback:
+    """A video playing in RcPlayer; stands in for the Popen of a per-video cvlc."""
+
+    def __init__(self, player, filepath, loop):
+        self.player = player
+        self.path = os.path.abspath(filepath)
+        self.loop = loop
+        # Set once rc reports this file as the new input
+        self.started = False
+        self.done = threading.Event()
+
+    def poll(self):
+        return 0 if self.done.is_set() else None
+
+    def wait(self, timeout=None):
+        if not self.done.wait(timeout):
+            raise subprocess.TimeoutExpired(RC_CMD[0], timeout)
+        return 0
+
+    def terminate(self):
+        self.player.stop(self)
+
+    kill = terminate
+
+class RcPlayer:
+    """A persistent cvlc that is told what to play over stdin (rc interface)."""
+
+    def __init__(self, cmd=RC_CMD):
+        fd, self.marq_file = tempfile.mkstemp(prefix="tvjuke-marq-", suffix=".txt")
+        os.close(fd)
+        self._marq_gen = 0
+        self._marq_lock = threading.Lock()
+        self.lock = threading.Lock()
+        # Held across switching current and sending its commands, so plays and
+        # stops from different threads reach VLC in the order current changes.
+        # Separate from lock so the status reader never waits on a pipe write.
+        self._play_lock = threading.Lock()
+        self.current = None
+        # Path of the input rc last reported, to tie state changes to a playback
+        self.input_path = None
+        self.played_any = False
+        # Set on VLC's first line of output, or when its stdout closes
+        self.responded = threading.Event()
+        self.closed = threading.Event()
+        try:
+            self.proc = subprocess.Popen(
+                [*cmd, f"--marq-file={self.marq_file}"],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, bufsize=1,
+                # Paths from os.scandir may carry surrogate escapes for non-UTF-8 names
+                encoding="utf-8", errors="surrogateescape",
+            )
+        except OSError:
+            os.unlink(self.marq_file)
+            raise
+        threading.Thread(target=self._read_status, daemon=True).start()
+
+    def wait_ready(self):
+        """Wait for the rc interface to come up; False if VLC exited or stayed silent."""
+        if not self.responded.wait(RC_STARTUP_SECONDS) or self.closed.is_set():
+            return False
+        try:
+            self.proc.wait(timeout=RC_SETTLE_SECONDS)
+        except subprocess.TimeoutExpired:
+            return True
+        return False
+
+    def alive(self):
+        return not self.closed.is_set() and self.proc.poll() is None
+
+    def close(self):
+        if self.proc.poll() is None:
+            self.proc.kill()
+        self.proc.wait()
+        try:
+            os.unlink(self.marq_file)
+        except OSError:
+            pass
+
+    def _send(self, *commands):
+        self.proc.stdin.write("".join(f"{c}\n" for c in commands))
+        self.proc.stdin.flush()
+
+    def _write_marquee(self, text):
+        tmp = f"{self.marq_file}.tmp"
+        with open(tmp, "w", encoding="utf-8", errors="replace") as f:
+            f.write(text)
+        os.replace(tmp, self.marq_file)
+
+    def _set_marquee(self, text):
+        with self._marq_lock:
+            self._marq_gen += 1
+            gen = self._marq_gen
+            self._write_marquee(text)
+        if text:
+            timer = threading.Timer(OSD_SECONDS, self._clear_marquee, args=(gen,))
+            timer.daemon = True
+            timer.start()
+
+    def _clear_marquee(self, gen):
+        # Under the lock so a newer title can't be written between check and clear
+        with self._marq_lock:
+            if gen == self._marq_gen:
+                self._write_marquee("")
+
+    def play(self, filepath, marquee_text="", loop=False):
+        playback = RcPlayback(self, filepath, loop)
+        with self._play_lock:
+            with self.lock:
+                if self.closed.is_set():
+                    raise BrokenPipeError("VLC rc interface has exited")
+                self.current = playback
+            try:
+                self._set_marquee(marquee_text)
+                self._send("clear", f"repeat {'on' if loop else 'off'}", f"add {_rc_quote(playback.path)}")
+            except Exception:
+                with self.lock:
+                    if self.current is playback:
+                        self.current = None
+                raise
+        return playback
+
+    def stop(self, playback):
+        with self._play_lock:
+            with self.lock:
+                is_current = self.current is playback
+                if is_current:
+                    self.current = None
+            if is_current:
+                try:
+                    self._send("stop")
+                except OSError:
+                    pass
+        playback.done.set()
+
+    def _read_status(self):
+        # rc reports "status change: ( new input: <mrl> )" when it opens a file,
+        # then "( play state: 3 )" and "( stop state: 5 )" as that input runs.
+        # A stop only ends the current playback if its own file is the input
+        # that stopped; looping playbacks reopen on repeat and only end via stop().
+        for line in self.proc.stdout:
+            self.responded.set()
+            if "new input:" in line:
+                path = _mrl_path(line)
+                with self.lock:
+                    self.input_path = path
+                    if self.current and self.current.path == path:
+                        self.current.started = True
+                        self.played_any = True
+            elif "stop state" in line:
+                with self.lock:
+                    playback = self.current
+                    if (playback and playback.started and not playback.loop
+                            and self.input_path == playback.path):
+                        self.current = None
+                    else:
+                        playback = None
+                if playback:
+                    playback.done.set()
+        # VLC went away; release whoever is waiting on startup or the current video
+        with self.lock:
+            self.closed.set()
+            playback, self.current = self.current, None
+        self.responded.set()
+        if playback:
+            playback.done.set()
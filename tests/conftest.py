@@ -0,0 +1,5 @@
+import pathlib
+import sys
+
+# The jukebox modules are plain scripts at the repo root, not an installed package
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
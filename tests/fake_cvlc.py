@@ -0,0 +1,61 @@
+"""Stand-in for cvlc's rc interface, printing the status lines RcPlayer reads.
+
+Videos play until a "fake-finish" line arrives on stdin, so tests decide
+when one ends instead of racing a timer.
+
+--fake-mode=exit         exit at once without output (rc module missing)
+--fake-mode=banner-exit  print the banner, then exit
+--fake-mode=die-on-play  exit as soon as a file is added
+"""
+import pathlib
+import shlex
+import sys
+
+# Like VLC, pass non-UTF-8 file names through as raw bytes
+sys.stdin.reconfigure(encoding="utf-8", errors="surrogateescape")
+sys.stdout.reconfigure(encoding="utf-8", errors="surrogateescape")
+
+args = dict(a.split("=", 1) for a in sys.argv[1:] if a.startswith("--fake-"))
+mode = args.get("--fake-mode")
+
+if mode == "exit":
+    sys.exit(1)
+print("Remote control interface initialized. Type `help' for help.", flush=True)
+if mode == "banner-exit":
+    sys.exit(1)
+
+current = None
+repeat = False
+
+def out(msg):
+    print(f"status change: ( {msg} )", flush=True)
+
+def open_input(path):
+    out(f"new input: {pathlib.Path(path).as_uri()}")
+    out("play state: 3")
+
+def stop():
+    global current
+    if current:
+        current = None
+        out("stop state: 5")
+
+for line in sys.stdin:
+    cmd, _, rest = line.strip().partition(" ")
+    if cmd in ("clear", "stop"):
+        stop()
+    elif cmd == "repeat":
+        repeat = rest == "on"
+    elif cmd == "add":
+        if mode == "die-on-play":
+            sys.exit(1)
+        stop()
+        current = shlex.split(rest)[0]
+        open_input(current)
+    elif cmd == "fake-finish" and current:
+        # The video reached its end; with repeat on VLC reopens the same input
+        out("stop state: 5")
+        if repeat:
+            open_input(current)
+        else:
+            current = None
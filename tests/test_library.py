@@ -0,0 +1,34 @@
+import os
+
+import library
+
+
+def test_iter_episodes_skips_unreadable_dirs(tmp_path, monkeypatch):
+    show = tmp_path / "Simpsons"
+    (show / "lost+found").mkdir(parents=True)
+    (show / "s01").mkdir()
+    (show / "s01" / "e01.mp4").touch()
+    (show / "e02.MKV").touch()
+
+    real_scandir = os.scandir
+    blocked = str(show / "lost+found")
+
+    def scandir(path):
+        if str(path) == blocked:
+            raise PermissionError(13, "Permission denied", blocked)
+        return real_scandir(path)
+
+    monkeypatch.setattr(library.os, "scandir", scandir)
+    assert sorted(library.iter_episodes(str(show))) == [
+        str(show / "e02.MKV"),
+        str(show / "s01" / "e01.mp4"),
+    ]
+
+
+def test_get_random_file_requires_extension(tmp_path):
+    (tmp_path / "mp4").touch()
+    (tmp_path / "webm").touch()
+    assert library.get_random_file(str(tmp_path)) is None
+
+    (tmp_path / "welcome.WebM").touch()
+    assert library.get_random_file(str(tmp_path)) == str(tmp_path / "welcome.WebM")
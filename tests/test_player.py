@@ -0,0 +1,121 @@
+import os
+import sys
+import time
+import pathlib
+import threading
+import subprocess
+
+import pytest
+
+import player
+
+FAKE_CVLC = str(pathlib.Path(__file__).with_name("fake_cvlc.py"))
+# Generous upper bound for anything we wait on; only slow runs get near it
+TIMEOUT = 5
+
+
+def start(*fake_args):
+    return player.RcPlayer(cmd=(sys.executable, FAKE_CVLC, *fake_args))
+
+
+def wait_until(predicate):
+    deadline = time.monotonic() + TIMEOUT
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+def finish(rc):
+    rc._send("fake-finish")
+
+
+@pytest.fixture
+def rc():
+    p = start()
+    assert p.wait_ready()
+    yield p
+    p.close()
+
+
+@pytest.mark.parametrize("mode", ["exit", "banner-exit"])
+def test_startup_failure_is_not_ready(mode):
+    p = start(f"--fake-mode={mode}")
+    assert not p.wait_ready()
+    assert not p.alive()
+    with pytest.raises(BrokenPipeError):
+        p.play("/videos/a.mp4")
+    p.close()
+
+
+def test_playback_ends_when_its_video_stops(rc):
+    playback = rc.play("/videos/a b.mp4", "hi")
+    assert wait_until(lambda: playback.started)
+    finish(rc)
+    assert playback.wait(timeout=TIMEOUT) == 0
+    assert rc.played_any
+
+
+def test_non_utf8_file_name(rc):
+    path = os.fsdecode(b"/videos/caf\xe9.mp4")
+    playback = rc.play(path, os.path.basename(path))
+    assert pathlib.Path(rc.marq_file).read_text(encoding="utf-8") == "caf?.mp4"
+    assert wait_until(lambda: playback.started)
+    finish(rc)
+    assert playback.wait(timeout=TIMEOUT) == 0
+
+
+def test_back_to_back_plays_only_end_the_latest(rc):
+    rc.play("/videos/a.mp4")
+    second = rc.play("/videos/b.mp4")
+    # The stop caused by replacing the first video comes before the second opens
+    # and must not end it
+    assert wait_until(lambda: second.started)
+    assert second.poll() is None
+    finish(rc)
+    assert second.wait(timeout=TIMEOUT) == 0
+
+
+def test_concurrent_plays_leave_current_on_the_playing_file(rc):
+    threads = [
+        threading.Thread(target=rc.play, args=(f"/videos/{i}.mp4",), kwargs={"loop": True})
+        for i in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # Whichever play() won, VLC must have been sent its file last
+    assert wait_until(lambda: rc.current.started)
+
+
+def test_loop_survives_repeat_until_stopped(rc):
+    playback = rc.play("/videos/welcome.mp4", loop=True)
+    assert wait_until(lambda: playback.started)
+    finish(rc)
+    finish(rc)
+    time.sleep(0.2)
+    assert playback.poll() is None
+    playback.terminate()
+    assert playback.wait(timeout=TIMEOUT) == 0
+
+
+def test_vlc_dying_mid_play_releases_playback():
+    p = start("--fake-mode=die-on-play")
+    assert p.wait_ready()
+    playback = p.play("/videos/a.mp4")
+    assert playback.wait(timeout=TIMEOUT) == 0
+    assert not p.alive()
+    assert not p.played_any
+    with pytest.raises(BrokenPipeError):
+        p.play("/videos/b.mp4")
+    p.close()
+
+
+def test_marquee_is_set_per_video_then_cleared(rc, monkeypatch):
+    monkeypatch.setattr(player, "OSD_SECONDS", 1)
+    marq = pathlib.Path(rc.marq_file)
+    rc.play("/videos/a.mp4", "|SHUFFLE| Cheers", loop=True)
+    assert marq.read_text() == "|SHUFFLE| Cheers"
+    rc.play("/videos/b.mp4", "|SHUFFLE| MASH", loop=True)
+    assert marq.read_text() == "|SHUFFLE| MASH"
+    assert wait_until(lambda: marq.read_text() == "")
@@ -1,19 +1,21 @@
 #!/usr/bin/env python3
 import os
 import sys
-import random
+import select
 import subprocess
 import time
 import threading
-import pathlib
-from evdev import InputDevice, categorize, ecodes
+import functools
+from dataclasses import dataclass, field
+from typing import Optional
+from evdev import InputDevice, ecodes
+from library import CURRENT_DIR, scan_shows, ensure_index, next_for, get_random_file
+from player import RcPlayer
 
 # --- CONFIGURATION ---
-CURRENT_DIR = pathlib.Path(__file__).parent.resolve()
-# CURRENT_DIR = pathlib.Path.cwd()
+# CURRENT_DIR (and SHOWS_DIR) are set in library.py
 WELCOME_DIR = CURRENT_DIR / "welcome-videos"
 ERROR_DIR = CURRENT_DIR / "error-videos"
-SHOWS_DIR = CURRENT_DIR / "shows"
 INPUT_DEVICE_PATH = "/dev/input/event0"
 
 # 9 (1), 8 (2), 7 (3), 6 (SKIP)
@@ -30,99 +32,135 @@ KEY_MAP = {
     9: {"short": "Seinfeld", "long": "It's Always Sunny in Philadelphia"},
 }
 
+# Static parts of the per-video cvlc command line, used when the shared RcPlayer
+# can't run; play_video() only adds the file and OSD text
+_CMD_PREFIX = (
+    "cvlc", "--fullscreen", "--quiet", "--video-on-top", "--gain=3",
+    "--no-video-title-show", "--intf", "dummy", "--aout", "alsa",
+    "--no-sub-autodetect-file", "--no-spu", "--play-and-exit",
+)
+_MARQ_OPTS = (
+    "--sub-source=marq",
+    "--marq-timeout=2000",
+    "--marq-position=0",
+    "--marq-size=0",
+    "--marq-opacity=255",
+    "--marq-color=0xFFFFFF",
+)
+
 SKIP_KEY_CODE = 6
 LONG_PRESS_SECONDS = 0.75
 LONGER_PRESS_SECONDS = 2
 
 # --- GLOBAL STATE ---
-current_process = None
-process_lock = threading.Lock()
-welcome_looping = False
-shuffle_all = False
-current_show = None
-
-# To control restart and exiting of run_jukebox
-exit_requested = False
+@dataclass
+class JukeState:
+    """Playback state for one run of the jukebox, shared by its threads."""
+    proc: Optional[subprocess.Popen] = None
+    # Bumped under lock on every proc assignment; readers compare it instead of locking
+    proc_gen: int = 0
+    current_show: Optional[str] = None
+    shuffle_all: bool = False
+    # Set to stop this run and restart run_jukebox
+    exit_evt: threading.Event = field(default_factory=threading.Event)
+    # Set while the welcome video is looping
+    welcome_evt: threading.Event = field(default_factory=threading.Event)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+# Set once the initial background scan has finished
+_scan_ready = threading.Event()
+
+# Shared RcPlayer, started on first use; _rc_failed disables it for good
+_rc_player = None
+_rc_failed = False
+_rc_lock = threading.Lock()
 
 # --- FUNCTIONS ---
-def scan_shows():
-    print("\n--- SHOWS LOADED ---")
-    all_shows = {}
-    total_episodes = 0
-
-    for show in sorted(os.listdir(SHOWS_DIR)):
-        show_path = os.path.join(SHOWS_DIR, show)
-        if os.path.isdir(show_path):
-            episodes = get_episodes(show)
-            if episodes:
-                all_shows[show] = episodes
-                total_episodes += len(episodes)
-
-    for show, episodes in all_shows.items():
-        percent = (len(episodes) / total_episodes * 100) if total_episodes else 0
-        print(f"{show}: {len(episodes)} episodes ({percent:.1f}%)")
-
-    print(f"Total episodes: {total_episodes}")
-    print("--- END SHOW SCAN ---\n")
-
-def get_random_file(path):
-    files = [f for f in os.listdir(path) if f.lower().endswith((".mp4", ".mkv", ".avi", ".webm"))]
-    return os.path.join(path, random.choice(files)) if files else None
-
-def get_episodes(show_name):
-    show_path = os.path.join(SHOWS_DIR, show_name)
-    episodes = []
-    for root, dirs, files in os.walk(show_path):
-        for f in files:
-            if f.lower().endswith((".mp4", ".mkv", ".avi", ".webm")):
-                episodes.append(os.path.join(root, f))
-    return episodes
-
-def stop_current_video():
-    global current_process
-    with process_lock:
-        if current_process and current_process.poll() is None:
-            print("Stopping current video...")
-            current_process.terminate()
-            try:
-                current_process.wait(timeout=2)
-            except subprocess.TimeoutExpired:
-                current_process.kill()
-        current_process = None
-
-def play_video(filepath, osd_message=None, loop=False):
-    global current_process
-    stop_current_video()
-
-    filename = os.path.basename(filepath)
-    name_without_ext = os.path.splitext(filename)[0]
-
-    cmd = [
-        "cvlc", "--fullscreen", "--quiet", "--video-on-top", "--gain=3",
-        "--no-video-title-show", "--intf", "dummy", "--aout", "alsa",
-        "--no-sub-autodetect-file", "--no-spu", "--play-and-exit", filepath
-    ]
-
-    if loop:
-        cmd += ["--loop"]
-    else:
-        marquee_text = osd_message or name_without_ext
-        cmd += [
-            "--sub-source=marq",
-            f"--marq-marquee={marquee_text}",
-            "--marq-timeout=2000",
-            "--marq-position=0",
-            "--marq-size=0",
-            "--marq-opacity=255",
-            "--marq-color=0xFFFFFF"
-        ]
+def stop_current_video(state):
+    # Only swap the reference under the lock; teardown can block for seconds
+    with state.lock:
+        proc, state.proc = state.proc, None
+        state.proc_gen += 1
+    if proc and proc.poll() is None:
+        print("Stopping current video...")
+        proc.terminate()
+        try:
+            proc.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+@functools.lru_cache(maxsize=2048)
+def _stem(filepath):
+    return os.path.splitext(os.path.basename(filepath))[0]
+
+def _get_rc_player():
+    """Return the shared RcPlayer, starting it if needed, or None to spawn cvlc per video."""
+    global _rc_player, _rc_failed
+    with _rc_lock:
+        if _rc_failed:
+            return None
+        if _rc_player:
+            if _rc_player.alive():
+                return _rc_player
+            _rc_player.close()
+            if not _rc_player.played_any:
+                # Died before ever opening a file, so restarting it would just die again
+                print("WARNING: VLC rc interface exited without playing, spawning cvlc per video.")
+                _rc_player = None
+                _rc_failed = True
+                return None
+            _rc_player = None
+        try:
+            player = RcPlayer()
+        except OSError as e:
+            print(f"WARNING: Could not start VLC rc interface ({e}), spawning cvlc per video.")
+            _rc_failed = True
+            return None
+        if not player.wait_ready():
+            print("WARNING: VLC rc interface not responding, spawning cvlc per video.")
+            player.close()
+            _rc_failed = True
+            return None
+        _rc_player = player
+        return player
+
+def play_video(state, filepath, osd_message=None, loop=False):
+    stop_current_video(state)
+
+    marquee_text = "" if loop else osd_message or _stem(filepath)
+    if not loop:
         print(f"Playing video: {filepath} with OSD: {marquee_text}")
 
-    process = subprocess.Popen(cmd)
-    with process_lock:
-        current_process = process
-
-def play_error_video(reason: str):
+    process = None
+    player = _get_rc_player()
+    if player:
+        try:
+            process = player.play(filepath, marquee_text, loop)
+        except OSError:
+            # VLC died under us; _get_rc_player() restarts it next time
+            process = None
+    if process is None:
+        if loop:
+            cmd = [*_CMD_PREFIX, filepath, "--loop"]
+        else:
+            cmd = [*_CMD_PREFIX, filepath, f"--marq-marquee={marquee_text}", *_MARQ_OPTS]
+        process = subprocess.Popen(cmd)
+    with state.lock:
+        state.proc = process
+        state.proc_gen += 1
+        gen = state.proc_gen
+    threading.Thread(target=_on_exit, args=(state, process, gen), daemon=True).start()
+    return process
+
+def _on_exit(state, proc, gen):
+    """Block until proc's video ends, then advance to the next episode if it is still current."""
+    proc.wait()
+    # proc is still current only if nothing has replaced or stopped it since it started
+    if state.proc_gen == gen and not state.welcome_evt.is_set() and not state.exit_evt.is_set():
+        print("Video ended. Starting next episode...")
+        next_episode(state)
+
+def play_error_video(state, reason: str):
     """Play a single error video (if available) with on-screen reason then exit.
 
     Falls back to printing if no error videos exist.
@@ -135,62 +173,37 @@ def play_error_video(reason: str):
         print(f"ERROR (no videos): {reason}")
         return
     print(f"Playing error video: {path} -> {reason}")
-    play_video(path, osd_message=reason, loop=False)
     # Wait until finished (or terminated)
-    while True:
-        with process_lock:
-            proc = current_process
-        if not proc or proc.poll() is not None:
-            break
-        time.sleep(0.25)
-
-def next_episode(osd=None):
-    global current_show, shuffle_all
-
-    if shuffle_all:
-        all_eps = []
-        for show in os.listdir(SHOWS_DIR):
-            show_path = os.path.join(SHOWS_DIR, show)
-            if os.path.isdir(show_path):
-                all_eps += get_episodes(show)
-        if all_eps:
-            episode = random.choice(all_eps)
-            play_video(episode, osd or "|SHUFFLE| ALL SHOWS")
-    elif current_show:
-        episodes = get_episodes(current_show)
-        if episodes:
-            episode = random.choice(episodes)
-            play_video(episode, osd or f"|SHUFFLE| {current_show}")
-
-def loop_welcome_video():
-    global welcome_looping, exit_requested
-    welcome_looping = True
-
-    while welcome_looping and not exit_requested:
+    play_video(state, path, osd_message=reason, loop=False).wait()
+
+def next_episode(state, osd=None):
+    _scan_ready.wait()
+    ensure_index()
+    if state.shuffle_all:
+        episode = next_for("__all__")
+        if episode:
+            play_video(state, episode, osd or "|SHUFFLE| ALL SHOWS")
+    elif state.current_show:
+        episode = next_for(state.current_show)
+        if episode:
+            play_video(state, episode, osd or f"|SHUFFLE| {state.current_show}")
+
+def loop_welcome_video(state):
+    while state.welcome_evt.is_set() and not state.exit_evt.is_set():
         path = get_random_file(WELCOME_DIR)
         if path:
             print(f"Selected welcome video: {path}")
-            play_video(path, loop=True)
-            while current_process and current_process.poll() is None and welcome_looping and not exit_requested:
-                time.sleep(1)
-
-def monitor_video_end():
-    global welcome_looping, exit_requested
-    while not exit_requested:
-        time.sleep(1)
-        with process_lock:
-            proc = current_process
-        if proc and proc.poll() is not None and not welcome_looping and not exit_requested:
-            print("Video ended. Starting next episode...")
-            next_episode()
-
-def handle_key_press(code, long_press=False):
+            # Returns once stop_current_video() terminates the loop
+            play_video(state, path, loop=True).wait()
+        else:
+            print("No welcome videos found.")
+            break
+
+def handle_key_press(state, code, long_press=False):
     """Handle press selecting short or long show mapping.
 
     long_press indicates duration exceeded LONG_PRESS_SECONDS threshold (but not LONGER_PRESS_SECONDS).
     """
-    global current_show, shuffle_all, welcome_looping
-
     if code not in KEY_MAP:
         print(f"Unknown key code: {code}")
         return
@@ -203,99 +216,125 @@ def handle_key_press(code, long_press=False):
     show = mapping["long" if long_press else "short"]
     print(f"Key pressed: {code} -> {'LONG' if long_press else 'SHORT'} -> {show}")
 
-    welcome_looping = False
-    current_show = show
-    shuffle_all = False
-    next_episode()
+    state.welcome_evt.clear()
+    state.current_show = show
+    state.shuffle_all = False
+    next_episode(state)
 
-def start_welcome_loop():
-    global welcome_looping
-    welcome_looping = True
-    threading.Thread(target=loop_welcome_video, daemon=True).start()
+def start_welcome_loop(state):
+    state.welcome_evt.set()
+    threading.Thread(target=loop_welcome_video, args=(state,), daemon=True).start()
 
-def run_jukebox():
-    global shuffle_all, current_show, welcome_looping, exit_requested
+def _iter_events(dev):
+    """Yield input events, draining everything buffered with one read() per epoll wakeup."""
+    ep = select.epoll()
+    ep.register(dev.fd, select.EPOLLIN)
+    try:
+        while True:
+            ep.poll()
+            try:
+                yield from dev.read()
+            except BlockingIOError:
+                continue
+    finally:
+        ep.close()
 
-    exit_requested = False
-    shuffle_all = False
-    current_show = None
-    welcome_looping = True
+def run_jukebox():
+    # Fresh state per run so threads left over from a previous run see their own exit_evt
+    state = JukeState()
+    state.welcome_evt.set()
 
     # Verify input device presence before proceeding.
     if not os.path.exists(INPUT_DEVICE_PATH):
         msg = "DEVICE MISSING: Check USB connection"
         print(f"WARNING: {msg}")
-        play_error_video(msg)
+        play_error_video(state, msg)
         return False
 
     try:
         dev = InputDevice(INPUT_DEVICE_PATH)
+        # Keep presses from also reaching X / the console
+        dev.grab()
     except Exception as e:
         msg = f"DEVICE ERROR: {e}"
         print(f"WARNING: {msg}")
-        play_error_video(msg)
+        play_error_video(state, msg)
         return False
 
-    # Only start welcome loop and monitor threads after device confirmed.
-    start_welcome_loop()
-    monitor_thread = threading.Thread(target=monitor_video_end, daemon=True)
-    monitor_thread.start()
+    # Only start welcome loop after device confirmed.
+    start_welcome_loop(state)
 
     print(f"Listening for input on {INPUT_DEVICE_PATH} ({dev.name})...")
 
     skip_pressed_time = None
-    # store key down times for non-skip keys to measure duration and choose short vs long show
-    key_pressed_times = {}
+    # key down times for non-skip keys, indexed by keycode (0.0 = not pressed),
+    # to measure duration and choose short vs long show
+    key_pressed_times = [0.0] * (max(KEY_MAP) + 1)
 
-    for event in dev.read_loop():
-        if exit_requested:
-            print("Exit requested, breaking input loop.")
-            stop_current_video()
-            break
+    try:
+        for event in _iter_events(dev):
+            # Most events are EV_SYN/EV_MSC noise; drop them before any other lookups
+            if event.type != ecodes.EV_KEY or event.code not in KEY_MAP:
+                continue
 
-        if event.type == ecodes.EV_KEY and event.code in KEY_MAP:
             # Key down
             if event.value == 1:
                 if event.code == SKIP_KEY_CODE:
-                    skip_pressed_time = time.time()
+                    skip_pressed_time = time.monotonic()
                 else:
-                    key_pressed_times[event.code] = time.time()
+                    key_pressed_times[event.code] = time.monotonic()
             # Key up
             elif event.value == 0:
                 # Handle SKIP release logic
                 if event.code == SKIP_KEY_CODE:
                     if skip_pressed_time:
-                        duration = time.time() - skip_pressed_time
+                        duration = time.monotonic() - skip_pressed_time
                         skip_pressed_time = None
                         if duration >= LONGER_PRESS_SECONDS:
                             print("Very long SKIP press — returning to welcome loop.")
-                            shuffle_all = False
-                            current_show = None
-                            exit_requested = True
-                            stop_current_video()
+                            state.shuffle_all = False
+                            state.current_show = None
+                            state.exit_evt.set()
+                            stop_current_video(state)
                         elif duration >= LONG_PRESS_SECONDS:
                             print("Long SKIP press — shuffle ALL shows.")
-                            shuffle_all = True
-                            current_show = None
-                            welcome_looping = False
-                            next_episode("|SHUFFLE| ALL SHOWS")
+                            state.shuffle_all = True
+                            state.current_show = None
+                            state.welcome_evt.clear()
+                            next_episode(state, "|SHUFFLE| ALL SHOWS")
                         else:
-                            if shuffle_all:
-                                next_episode("|SHUFFLE| ALL SHOWS")
-                            elif current_show:
-                                next_episode(f"|SHUFFLE| {current_show}")
+                            if state.shuffle_all:
+                                next_episode(state, "|SHUFFLE| ALL SHOWS")
+                            elif state.current_show:
+                                next_episode(state, f"|SHUFFLE| {state.current_show}")
                 else:
                     # Non-skip key release: determine duration
-                    pressed_time = key_pressed_times.pop(event.code, None)
+                    pressed_time = key_pressed_times[event.code]
+                    key_pressed_times[event.code] = 0.0
                     if pressed_time:
-                        duration = time.time() - pressed_time
+                        duration = time.monotonic() - pressed_time
                         long_press = duration >= LONG_PRESS_SECONDS
-                        handle_key_press(event.code, long_press=long_press)
+                        handle_key_press(state, event.code, long_press=long_press)
+
+            if state.exit_evt.is_set():
+                print("Exit requested, breaking input loop.")
+                stop_current_video(state)
+                break
+    finally:
+        # Releases the grab so the next run can open the device again
+        dev.close()
 
     return True
 
+def initial_scan():
+    try:
+        scan_shows()
+    finally:
+        _scan_ready.set()
+
 def main():
-    scan_shows()
+    # Scan in the background so the welcome loop can start right away
+    threading.Thread(target=initial_scan, daemon=True).start()
     while True:
         success = run_jukebox()
         if not success: